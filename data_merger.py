@@ -1,5 +1,6 @@
 import pandas as pd
 import os
+from frame_schema import load_compact_csv
 
 def merge_all_data(main_file: str, reddit_file: str, twitter_file: str, output_file: str):
     """
@@ -13,9 +14,14 @@ def merge_all_data(main_file: str, reddit_file: str, twitter_file: str, output_f
     """
     # --- Step 1: Read all three CSV files ---
     try:
-        main_df = pd.read_csv(main_file)
-        reddit_df = pd.read_csv(reddit_file)
-        twitter_df = pd.read_csv(twitter_file)
+        # Only the date and final score are needed from the sentiment files, so the
+        # raw text and per-column scores are never loaded. Dates repeat across posts,
+        # so they are loaded as categoricals; the weighted scores stay float64.
+        main_df = load_compact_csv(main_file)
+        reddit_df = load_compact_csv(reddit_file, category_columns=['Date'],
+                                     usecols=['Date', 'weighted_sentiment_score'])
+        twitter_df = load_compact_csv(twitter_file, category_columns=['Date'],
+                                      usecols=['Date', 'final_weighted_score'])
         print(f"\nSuccessfully loaded all source files.")
     except FileNotFoundError as e:
         print(f"Error: Could not find a required file. {e}")
@@ -66,8 +72,9 @@ if __name__ == "__main__":
     # Define the file paths
     COIN_NAME = "bitcoin"
     main_csv_path = f'coin_data/{COIN_NAME}_data.csv'
-    reddit_csv_path = f'reddit_data/{COIN_NAME}_reddit_data.csv'
-    twitter_reformatted_path = f'twitter_data/{COIN_NAME}_twitter_data.csv'
+    # Scored output of the NLP stages, with near-duplicate posts collapsed
+    reddit_csv_path = f'reddit_data/{COIN_NAME}_reddit_data_deduped.csv'
+    twitter_reformatted_path = f'twitter_data/{COIN_NAME}_twitter_data_deduped.csv'
     output_csv_path = f'training_data/{COIN_NAME}_final.csv'
 
     # Run the main merging function
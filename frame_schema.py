@@ -0,0 +1,135 @@
+import pandas as pd
+
+try:
+    import pyarrow
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    # Without pyarrow, plain object columns are the most compact option pandas offers.
+    pyarrow = None
+    STRING_DTYPE = object
+
+# --- Known columns of the scraped CSVs ---
+REDDIT_TEXT_COLUMNS = ['Post Title', 'Post Description', 'Comment 1', 'Comment 2', 'Comment 3', 'Comment 4', 'Comment 5']
+REDDIT_CATEGORY_COLUMNS = ['Subreddit', 'Date']
+REDDIT_STRING_COLUMNS = REDDIT_TEXT_COLUMNS + ['Post URL']
+
+TWITTER_TEXT_COLUMNS = ['tweet_text']
+TWITTER_CATEGORY_COLUMNS = ['Date']
+
+# Columns holding counts that always fit in 32 bits.
+COUNT_COLUMNS = ['Score', 'tweet_favorite_count', 'user_followers_count', 'duplicate_count']
+
+# Score columns created by the NLP stages, the only floats stored as float32.
+# Weighted scores are products of a score and a large weight, so float32 would add
+# visible rounding noise (e.g. 346 * 3.2 = 1107.2001); they are left as float64,
+# like every float column the stages don't own (prices, IDs with gaps).
+SCORE_COLUMNS = [f"{col}_score" for col in REDDIT_TEXT_COLUMNS] + [
+    'total_sentiment_score', 'sentiment_score', 'follower_influence_score',
+]
+
+# Object columns with fewer unique values than this share of rows become categoricals.
+CATEGORY_RATIO = 0.5
+
+
+def compact_frame(df: pd.DataFrame, category_columns: list = None, string_columns: list = None) -> pd.DataFrame:
+    """
+    Converts a DataFrame to a compact memory layout in place and returns it.
+
+    - The score columns in SCORE_COLUMNS are downcast to float32 and known count
+      columns to int32. Other float columns are left as they are.
+    - The given category columns (and any other low-cardinality text column)
+      become categoricals.
+    - The remaining text columns become Arrow-backed strings when pyarrow is installed.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to compact.
+        category_columns (list): Columns that should always be categoricals.
+        string_columns (list): Columns that should always be strings (e.g. free text),
+            even when they happen to have few unique values.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with compact dtypes.
+    """
+    category_columns = category_columns or []
+    string_columns = string_columns or []
+
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in COUNT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int32')
+        elif pd.api.types.is_float_dtype(dtype):
+            if col in SCORE_COLUMNS:
+                df[col] = df[col].astype('float32')
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+            continue
+        elif col in category_columns:
+            df[col] = df[col].astype('category')
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            if col not in string_columns and len(df) and df[col].nunique() < CATEGORY_RATIO * len(df):
+                df[col] = df[col].astype('category')
+            else:
+                df[col] = df[col].astype(STRING_DTYPE)
+    return df
+
+
+def _read_dtypes(file_path: str, category_columns: list, string_columns: list) -> dict:
+    """
+    Builds the read_csv dtype mapping for the known columns present in the file.
+    """
+    header = pd.read_csv(file_path, nrows=0).columns
+    dtypes = {col: 'category' for col in category_columns if col in header}
+    dtypes.update({col: STRING_DTYPE for col in string_columns if col in header})
+    return dtypes
+
+
+def iter_csv_chunks(file_path: str, category_columns: list = None, string_columns: list = None,
+                    chunksize: int = 20000):
+    """
+    Reads a CSV in chunks, with known text columns parsed as strings and known
+    categorical columns as categoricals. Only one chunk is in memory at a time.
+
+    Args:
+        file_path (str): Path to the CSV file.
+        category_columns (list): Columns to load as categoricals.
+        string_columns (list): Free-text columns to load as strings.
+        chunksize (int): Number of rows per chunk.
+
+    Yields:
+        pd.DataFrame: The next chunk of rows.
+    """
+    dtypes = _read_dtypes(file_path, category_columns or [], string_columns or [])
+    for chunk in pd.read_csv(file_path, dtype=dtypes, chunksize=chunksize):
+        yield chunk
+        # Arrow's allocator keeps freed buffers cached; hand them back between chunks.
+        if pyarrow is not None:
+            pyarrow.default_memory_pool().release_unused()
+
+
+def load_compact_csv(file_path: str, category_columns: list = None, string_columns: list = None,
+                     usecols: list = None) -> pd.DataFrame:
+    """
+    Reads a CSV straight into a compact memory layout.
+
+    Known text columns are parsed as strings and known categorical columns as
+    categoricals while reading, so the full object-dtype copy is never built.
+
+    Args:
+        file_path (str): Path to the CSV file.
+        category_columns (list): Columns to load as categoricals.
+        string_columns (list): Free-text columns to load as strings.
+        usecols (list): Optional subset of columns to load.
+
+    Returns:
+        pd.DataFrame: The loaded DataFrame.
+    """
+    category_columns = category_columns or []
+    string_columns = string_columns or []
+
+    dtypes = _read_dtypes(file_path, category_columns, string_columns)
+    if usecols is not None:
+        dtypes = {col: dtype for col, dtype in dtypes.items() if col in usecols}
+
+    df = pd.read_csv(file_path, dtype=dtypes, usecols=usecols)
+    return compact_frame(df, category_columns, string_columns)
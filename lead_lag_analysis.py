@@ -0,0 +1,315 @@
+import pandas as pd
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+SENTIMENT_COLUMNS = ['reddit_sentiment_score', 'twitter_sentiment_score']
+
+
+def _standardize(x: np.ndarray) -> np.ndarray:
+    """
+    Scales each series (along the last axis) to zero mean and unit variance.
+    Constant series become all NaN, since they carry no signal.
+    """
+    mean = x.mean(axis=-1, keepdims=True)
+    std = x.std(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(std > 0, (x - mean) / std, np.nan)
+
+
+def fft_cross_correlation(signal: np.ndarray, returns: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Computes the cross-correlation between a signal and returns for every lag
+    from -max_lag to +max_lag using the FFT.
+
+    A positive lag k measures corr(signal[t], returns[t + k]), i.e. the signal
+    leading the price. A negative lag means the signal is reacting to the price.
+
+    Args:
+        signal (np.ndarray): Sentiment series with shape (..., n). Leading axes are
+            treated as a batch (e.g. bootstrap resamples).
+        returns (np.ndarray): Return series with shape (n,).
+        max_lag (int): The largest lag to compute in each direction.
+
+    Returns:
+        np.ndarray: Correlations with shape (..., 2 * max_lag + 1), ordered from
+        lag -max_lag to +max_lag.
+    """
+    n = returns.shape[-1]
+    x = _standardize(signal)
+    y = _standardize(returns)
+
+    # Zero-pad so the circular correlation computed by the FFT equals the linear one.
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    spectrum = np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size)
+    raw = np.fft.irfft(spectrum, size)
+
+    # raw[k] = sum_t x[t] * y[t + k]; negative lags wrap around to the end.
+    correlation = np.concatenate([raw[..., size - max_lag:], raw[..., :max_lag + 1]], axis=-1)
+    return correlation / n
+
+
+def _lagged_matrix(x: np.ndarray, order: int, max_lag: int) -> np.ndarray:
+    """
+    Stacks x[t - 1], ..., x[t - order] as columns for t = max_lag .. n - 1.
+    Leading axes of x are kept as batch axes.
+    """
+    n = x.shape[-1]
+    return np.stack([x[..., max_lag - lag:n - lag] for lag in range(1, order + 1)], axis=-1)
+
+
+def _residual_sum_of_squares(design: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Solves a batch of least-squares problems through their normal equations and
+    returns the residual sum of squares of each one. The pseudo-inverse is used
+    so a constant lagged column (e.g. a sparse signal that is all zeros in the
+    first rows) gives the minimum-norm fit instead of a singular-matrix error.
+
+    Args:
+        design (np.ndarray): Design matrices with shape (batch, m, k).
+        target (np.ndarray): Targets with shape (m,).
+    """
+    gram = np.einsum('bmi,bmj->bij', design, design)
+    moment = np.einsum('bmi,m->bi', design, target)
+    coefficients = np.einsum('bij,bj->bi', np.linalg.pinv(gram, hermitian=True), moment)
+    residuals = target - np.einsum('bmi,bi->bm', design, coefficients)
+    return np.einsum('bm,bm->b', residuals, residuals)
+
+
+def granger_f_statistics(signal: np.ndarray, returns: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Computes Granger-style F statistics for lag orders 1..max_lag.
+
+    For each order p, returns[t] is regressed on its own p past values (restricted
+    model) and on its own past values plus p past values of the signal (unrestricted
+    model). A large F means the signal's past helps explain future returns.
+    Every order uses the same sample (t >= max_lag), so the statistics are comparable.
+
+    Args:
+        signal (np.ndarray): Sentiment series with shape (batch, n).
+        returns (np.ndarray): Return series with shape (n,).
+        max_lag (int): The largest lag order to test.
+
+    Returns:
+        np.ndarray: F statistics with shape (batch, max_lag).
+    """
+    batch, n = signal.shape
+    target = returns[max_lag:]
+    m = target.shape[0]
+    # Standardizing keeps the normal equations well conditioned.
+    signal = np.nan_to_num(_standardize(signal))
+
+    f_stats = np.full((batch, max_lag), np.nan)
+    for order in range(1, max_lag + 1):
+        dof = m - 2 * order - 1
+        if dof <= 0:
+            break
+        intercept = np.ones((m, 1))
+        own_lags = _lagged_matrix(returns, order, max_lag)
+        restricted = np.concatenate([intercept, own_lags], axis=1)[None]
+        unrestricted = np.concatenate([
+            np.broadcast_to(restricted, (batch, m, order + 1)),
+            _lagged_matrix(signal, order, max_lag),
+        ], axis=2)
+
+        rss_restricted = _residual_sum_of_squares(restricted, target)
+        rss_unrestricted = _residual_sum_of_squares(unrestricted, target)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            f_stats[:, order - 1] = ((rss_restricted - rss_unrestricted) / order) / (rss_unrestricted / dof)
+    return f_stats
+
+
+def _circular_shift_resamples(signal: np.ndarray, n_bootstrap: int, min_shift: int, seed: int) -> np.ndarray:
+    """
+    Builds null resamples by rotating the signal by random offsets. This keeps the
+    signal's own autocorrelation but breaks any alignment with the returns.
+    """
+    n = signal.shape[0]
+    rng = np.random.default_rng(seed)
+    shifts = rng.integers(min_shift, n - min_shift, size=n_bootstrap)
+    index = (np.arange(n)[None, :] + shifts[:, None]) % n
+    return signal[index]
+
+
+def _bootstrap_p_values(observed: np.ndarray, null: np.ndarray) -> np.ndarray:
+    """
+    Share of null resamples at least as large as the observed statistic, with the
+    usual +1 correction. NaN resamples are ignored, and a NaN observed statistic
+    (e.g. from a constant price series) gets a NaN p-value.
+    """
+    valid = np.isfinite(null)
+    exceed = np.sum(valid & (null >= observed), axis=0)
+    with np.errstate(invalid='ignore'):
+        p_values = (exceed + 1) / (valid.sum(axis=0) + 1)
+    return np.where(np.isfinite(observed), p_values, np.nan)
+
+
+def benjamini_hochberg(p_values: np.ndarray) -> np.ndarray:
+    """
+    Adjusts p-values for multiple testing with the Benjamini-Hochberg procedure,
+    which controls the false discovery rate across all the tests given.
+    NaN p-values are not counted as tests and stay NaN.
+
+    Args:
+        p_values (np.ndarray): Raw p-values of any shape.
+
+    Returns:
+        np.ndarray: Adjusted p-values with the same shape.
+    """
+    p_values = np.asarray(p_values, dtype='float64')
+    adjusted = np.full(p_values.shape, np.nan)
+    valid = np.isfinite(p_values)
+    p = p_values[valid]
+    if p.size == 0:
+        return adjusted
+
+    order = np.argsort(p)
+    ranked = p[order] * p.size / np.arange(1, p.size + 1)
+    # Each adjusted value is the smallest ranked value at or above its rank.
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    q = np.empty_like(p)
+    q[order] = np.minimum(ranked, 1.0)
+    adjusted[valid] = q
+    return adjusted
+
+
+def analyze_coin(coin_name: str, file_path: str, max_lag: int = 7, n_bootstrap: int = 1000,
+                 seed: int = 42) -> pd.DataFrame:
+    """
+    Builds the lead/lag table for a single coin from its data_merger output.
+
+    Args:
+        coin_name (str): The coin's name, used to label the rows.
+        file_path (str): Path to the merged CSV (e.g. 'training_data/bitcoin_final.csv').
+        max_lag (int): The largest lag (in days) to test in each direction.
+        n_bootstrap (int): Number of circular-shift resamples used for p-values.
+        seed (int): Seed for the resamples, so runs are reproducible.
+
+    Returns:
+        pd.DataFrame: One row per sentiment source and lag. 'granger_f' and
+        'granger_p_value' are filled for lags >= 1, where the lag is the model order.
+    """
+    df = pd.read_csv(file_path)
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df = df.dropna(subset=['Date']).sort_values('Date')
+
+    price_column = next((col for col in ['price', 'close'] if col in df.columns), None)
+    if price_column is None:
+        print(f"Warning: No 'price' or 'close' column found for {coin_name}. Skipping.")
+        return pd.DataFrame()
+    returns = df[price_column].astype('float64').pct_change().to_numpy()[1:]
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    rows = []
+    for column in SENTIMENT_COLUMNS:
+        if column not in df.columns:
+            print(f"Warning: '{column}' not found for {coin_name}. Skipping.")
+            continue
+        signal = df[column].fillna(0).astype('float64').to_numpy()[1:]
+        if len(signal) < 4 * max_lag or np.std(signal) == 0:
+            print(f"Warning: Not enough varying '{column}' data for {coin_name}. Skipping.")
+            continue
+
+        # Row 0 is the observed signal, the remaining rows are the null resamples.
+        resamples = _circular_shift_resamples(signal, n_bootstrap, max_lag + 1, seed)
+        signals = np.vstack([signal[None, :], resamples])
+
+        xcorr = fft_cross_correlation(signals, returns, max_lag)
+        xcorr_p = _bootstrap_p_values(np.abs(xcorr[0]), np.abs(xcorr[1:]))
+
+        f_stats = granger_f_statistics(signals, returns, max_lag)
+        f_p = _bootstrap_p_values(f_stats[0], f_stats[1:])
+
+        for i, lag in enumerate(lags):
+            order = lag - 1
+            rows.append({
+                'coin': coin_name,
+                'signal': column,
+                'lag': int(lag),
+                'cross_correlation': xcorr[0, i],
+                'xcorr_p_value': xcorr_p[i],
+                'granger_f': f_stats[0, order] if lag >= 1 else np.nan,
+                'granger_p_value': f_p[order] if lag >= 1 else np.nan,
+            })
+    return pd.DataFrame(rows)
+
+
+def run_lead_lag_analysis(coin_names: list, data_dir: str = 'training_data',
+                          output_file: str = 'analysis/lead_lag_table.csv', max_lag: int = 7,
+                          n_bootstrap: int = 1000, workers: int = None) -> pd.DataFrame:
+    """
+    Runs the lead/lag analysis for every coin in parallel and saves one combined
+    lag-significance table. 'xcorr_p_adjusted' and 'granger_p_adjusted' hold the
+    Benjamini-Hochberg adjusted p-values over every test in the table.
+
+    Args:
+        coin_names (list): Coins to analyze. Each needs '{data_dir}/{coin}_final.csv'.
+        data_dir (str): Directory holding the data_merger output files.
+        output_file (str): Path for the combined table.
+        max_lag (int): The largest lag (in days) to test in each direction.
+        n_bootstrap (int): Number of resamples used for p-values.
+        workers (int): Number of worker processes (defaults to the CPU count).
+
+    Returns:
+        pd.DataFrame: The combined lag-significance table.
+    """
+    # --- Step 1: Find the merged file for every coin ---
+    jobs = {}
+    for coin_name in coin_names:
+        file_path = os.path.join(data_dir, f"{coin_name}_final.csv")
+        if os.path.exists(file_path):
+            jobs[coin_name] = file_path
+        else:
+            print(f"Warning: '{file_path}' was not found. Skipping {coin_name}.")
+
+    if not jobs:
+        print("Error: No merged data files found. Nothing to analyze.")
+        return pd.DataFrame()
+
+    # --- Step 2: Analyze every coin in parallel ---
+    print(f"Analyzing {len(jobs)} coins over lags -{max_lag}..{max_lag} with {n_bootstrap} resamples...")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(analyze_coin, coin_name, file_path, max_lag, n_bootstrap)
+            for coin_name, file_path in jobs.items()
+        ]
+        tables = []
+        for coin_name, future in zip(jobs, futures):
+            # One bad coin shouldn't lose the table for all the others
+            try:
+                tables.append(future.result())
+            except Exception as e:
+                print(f"An error occurred while analyzing {coin_name}: {e}")
+
+    table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+    # --- Step 3: Correct for testing every coin, signal and lag at once ---
+    # All cross-correlation and Granger tests in the table form one family.
+    if not table.empty:
+        p_columns = ['xcorr_p_value', 'granger_p_value']
+        adjusted = benjamini_hochberg(table[p_columns].to_numpy())
+        table['xcorr_p_adjusted'] = adjusted[:, 0]
+        table['granger_p_adjusted'] = adjusted[:, 1]
+
+    # --- Step 4: Save the table ---
+    try:
+        output_dir = os.path.dirname(output_file)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        table.to_csv(output_file, index=False)
+        print(f"\nSuccessfully saved the lag-significance table to '{output_file}'.")
+    except Exception as e:
+        print(f"An error occurred while saving the file: {e}")
+
+    return table
+
+
+# --- Main execution block ---
+if __name__ == "__main__":
+    COIN_NAMES = ["bitcoin", "pepe", "ripple", "shiba", "trump"]
+
+    table = run_lead_lag_analysis(COIN_NAMES)
+    if not table.empty:
+        # Show the lags where sentiment is significant at a 5% false discovery rate
+        print(table[(table['xcorr_p_adjusted'] < 0.05) | (table['granger_p_adjusted'] < 0.05)])
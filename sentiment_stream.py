@@ -0,0 +1,443 @@
+import json
+import math
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+import pandas as pd
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from twitter_utils.twitter_nlp import setup_vader, analyze_sentiment_score
+from frame_schema import REDDIT_TEXT_COLUMNS
+
+# Events are JSON objects, one per line, shaped like a row of the scraped CSVs plus
+# 'source' ('reddit' or 'twitter') and 'coin'. The time is read from 'created_utc'
+# (epoch seconds), 'tweet_created_at' (Twitter's format) or 'Date', in that order.
+TWITTER_DATE_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+
+# --- Event Sources ---
+class FileTailSource:
+    """
+    Follows a JSON-lines file like `tail -f`, yielding each new event as it is written.
+    The byte offset is checkpointed so a restarted stream resumes where it stopped.
+    """
+
+    def __init__(self, file_path: str, poll_interval: float = 0.1):
+        self.file_path = file_path
+        self.poll_interval = poll_interval
+        self.offset = 0
+
+    def checkpoint(self) -> dict:
+        return {'offset': self.offset}
+
+    def restore(self, state: dict):
+        self.offset = state.get('offset', 0)
+
+    def events(self, stop_event: threading.Event):
+        """
+        Yields events until stop_event is set. Waits for the file if it doesn't exist yet,
+        and starts over from the beginning when the file is truncated or replaced.
+        """
+        while not stop_event.is_set():
+            try:
+                f = open(self.file_path, 'rb')
+            except FileNotFoundError:
+                stop_event.wait(self.poll_interval)
+                continue
+            with f:
+                yield from self._follow(f, stop_event)
+
+    def _follow(self, f, stop_event: threading.Event):
+        """
+        Yields complete lines from an open file until it is truncated or replaced.
+        """
+        f.seek(self.offset)
+        buffer = b''
+        while not stop_event.is_set():
+            chunk = f.readline()
+            if not chunk:
+                if self._file_was_reset(f):
+                    return
+                stop_event.wait(self.poll_interval)
+                continue
+            buffer += chunk
+            # Only consume complete lines; a partial line is still being written.
+            if not buffer.endswith(b'\n'):
+                continue
+            self.offset += len(buffer)
+            line, buffer = buffer.strip(), b''
+            if line:
+                yield line
+
+    def _file_was_reset(self, f) -> bool:
+        """
+        Checks whether the file was replaced (e.g. rotated) or is now shorter than the
+        current offset (truncated, or a stale restored offset). If so, the offset is
+        reset to 0 so the file is read again from the start.
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            # Removed mid-rotation; keep the old file until the new one appears.
+            return False
+
+        if stat.st_ino != os.fstat(f.fileno()).st_ino:
+            print(f"Warning: '{self.file_path}' was replaced. Reading the new file from the start.")
+        elif stat.st_size < self.offset:
+            print(f"Warning: '{self.file_path}' is shorter than the last position "
+                  f"({stat.st_size} < {self.offset} bytes). Reading it again from the start.")
+        else:
+            return False
+        self.offset = 0
+        return True
+
+
+class SocketSource:
+    """
+    Listens on a TCP port and yields JSON-lines events sent by any connected client.
+    Stands in for a live feed; a socket can't be replayed, so there is nothing to checkpoint.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9009, poll_interval: float = 0.1):
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+
+    def checkpoint(self) -> dict:
+        return {}
+
+    def restore(self, state: dict):
+        pass
+
+    def events(self, stop_event: threading.Event):
+        """
+        Yields events from one client connection at a time until stop_event is set.
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((self.host, self.port))
+            server.listen()
+            server.settimeout(self.poll_interval)
+            print(f"Listening for events on {self.host}:{self.port}...")
+
+            while not stop_event.is_set():
+                try:
+                    connection, address = server.accept()
+                except socket.timeout:
+                    continue
+                with connection:
+                    connection.settimeout(self.poll_interval)
+                    buffer = b''
+                    while not stop_event.is_set():
+                        try:
+                            data = connection.recv(65536)
+                        except socket.timeout:
+                            continue
+                        if not data:
+                            break
+                        buffer += data
+                        *lines, buffer = buffer.split(b'\n')
+                        for line in lines:
+                            if line.strip():
+                                yield line.strip()
+
+
+# --- Scoring ---
+def _event_number(event: dict, key: str) -> float:
+    """
+    Reads a numeric field of an event, treating missing, non-numeric, NaN and
+    infinite values as 0 like the batch stages' to_numeric(...).fillna(0).
+    """
+    try:
+        value = float(event.get(key) or 0)
+    except (TypeError, ValueError, OverflowError):
+        return 0.0
+    return value if math.isfinite(value) else 0.0
+
+
+def score_reddit_event(event: dict, sid: SentimentIntensityAnalyzer) -> float:
+    """
+    Scores one Reddit post the same way as 'weighted_sentiment_score' in reddit_nlp:
+    the summed compound score of the title, description and comments, multiplied by
+    the post's score (or 1 when the score is 0).
+    """
+    total_sentiment_score = sum(analyze_sentiment_score(event.get(col), sid) for col in REDDIT_TEXT_COLUMNS)
+    multiplier = _event_number(event, 'Score')
+    if multiplier == 0:
+        multiplier = 1.0
+    return total_sentiment_score * multiplier
+
+
+def score_twitter_event(event: dict, sid: SentimentIntensityAnalyzer) -> float:
+    """
+    Scores one tweet the same way as 'final_weighted_score' in twitter_nlp:
+    compound score * favorites * log(1 + followers).
+    """
+    sentiment_score = analyze_sentiment_score(event.get('tweet_text'), sid)
+    favorites = _event_number(event, 'tweet_favorite_count')
+    followers = _event_number(event, 'user_followers_count')
+    return sentiment_score * favorites * math.log1p(followers)
+
+
+def event_timestamp(event: dict) -> float:
+    """
+    Returns the event's time as epoch seconds, falling back to the arrival time
+    when the event has no usable time (missing, malformed or out of range).
+    """
+    try:
+        if event.get('created_utc') is not None:
+            timestamp = float(event['created_utc'])
+        elif event.get('tweet_created_at'):
+            timestamp = datetime.strptime(event['tweet_created_at'], TWITTER_DATE_FORMAT).timestamp()
+        elif event.get('Date'):
+            timestamp = pd.Timestamp(event['Date'], tz='UTC').timestamp()
+        else:
+            return time.time()
+        # Make sure the time can be turned into a bucket (rejects NaN, inf and 1e20)
+        datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        return timestamp
+    except (TypeError, ValueError, OverflowError, OSError):
+        return time.time()
+
+
+# --- Aggregation ---
+class SentimentAggregator:
+    """
+    Thread-safe running sums of sentiment per coin and time bucket.
+
+    With the default one-day buckets, each bucket's 'reddit_sentiment_score' and
+    'twitter_sentiment_score' equal what merge_all_data would compute for that day.
+    """
+
+    def __init__(self, bucket_seconds: int = 86400):
+        self.bucket_seconds = bucket_seconds
+        self._lock = threading.Lock()
+        # (coin, bucket start as ISO string) -> running totals
+        self._buckets = {}
+
+    def bucket_start(self, timestamp: float) -> str:
+        start = int(timestamp // self.bucket_seconds) * self.bucket_seconds
+        return datetime.fromtimestamp(start, tz=timezone.utc).isoformat()
+
+    def add(self, coin: str, timestamp: float, source: str, score: float):
+        key = (coin, self.bucket_start(timestamp))
+        with self._lock:
+            totals = self._buckets.setdefault(key, {
+                'reddit_sentiment_score': 0.0, 'twitter_sentiment_score': 0.0,
+                'reddit_posts': 0, 'tweets': 0,
+            })
+            if source == 'reddit':
+                totals['reddit_sentiment_score'] += score
+                totals['reddit_posts'] += 1
+            else:
+                totals['twitter_sentiment_score'] += score
+                totals['tweets'] += 1
+
+    def current(self, coin: str) -> dict:
+        """
+        Returns the totals of the coin's bucket containing the current time.
+        """
+        key = (coin, self.bucket_start(time.time()))
+        with self._lock:
+            totals = self._buckets.get(key, {
+                'reddit_sentiment_score': 0.0, 'twitter_sentiment_score': 0.0,
+                'reddit_posts': 0, 'tweets': 0,
+            })
+            return {'coin': coin, 'bucket': key[1], **totals}
+
+    def to_frame(self, coin: str = None) -> pd.DataFrame:
+        """
+        Returns all buckets (optionally for one coin) as a DataFrame sorted by time.
+        """
+        with self._lock:
+            rows = [
+                {'coin': key[0], 'bucket': key[1], **totals}
+                for key, totals in self._buckets.items()
+                if coin is None or key[0] == coin
+            ]
+        if not rows:
+            return pd.DataFrame(columns=['coin', 'bucket', 'reddit_sentiment_score',
+                                         'twitter_sentiment_score', 'reddit_posts', 'tweets'])
+        return pd.DataFrame(rows).sort_values(['coin', 'bucket']).reset_index(drop=True)
+
+    def state(self) -> list:
+        with self._lock:
+            return [[coin, bucket, dict(totals)] for (coin, bucket), totals in self._buckets.items()]
+
+    def load_state(self, state: list):
+        with self._lock:
+            self._buckets = {(coin, bucket): totals for coin, bucket, totals in state}
+
+
+# --- Streaming Pipeline ---
+class SentimentStream:
+    """
+    Long-running loop that scores events from a source as they arrive and keeps the
+    aggregates up to date. Snapshots of the aggregates and the source position are
+    written to disk periodically, and loaded again on start for crash recovery.
+    """
+
+    def __init__(self, source, snapshot_file: str = 'stream_data/sentiment_snapshot.json',
+                 snapshot_interval: float = 30.0, bucket_seconds: int = 86400):
+        self.source = source
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self.aggregator = SentimentAggregator(bucket_seconds)
+        self.events_processed = 0
+        self.last_latency = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._sid = None
+        # The exception that stopped the worker thread, if any
+        self.error = None
+
+    def load_snapshot(self):
+        """
+        Restores the aggregates and source position from the last snapshot, if any.
+        """
+        if not os.path.exists(self.snapshot_file):
+            return
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.aggregator.load_state(snapshot['aggregates'])
+            self.source.restore(snapshot.get('source', {}))
+            self.events_processed = snapshot.get('events_processed', 0)
+            print(f"Restored snapshot from '{self.snapshot_file}' ({self.events_processed} events).")
+        except Exception as e:
+            print(f"An error occurred while loading the snapshot, starting fresh: {e}")
+
+    def save_snapshot(self):
+        """
+        Writes the aggregates and source position to disk. The file is replaced
+        atomically, so a crash mid-write never leaves a corrupt snapshot behind.
+        """
+        snapshot = {
+            'aggregates': self.aggregator.state(),
+            'source': self.source.checkpoint(),
+            'events_processed': self.events_processed,
+            'saved_at': time.time(),
+        }
+        try:
+            output_dir = os.path.dirname(self.snapshot_file)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            temp_file = f"{self.snapshot_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(temp_file, self.snapshot_file)
+        except Exception as e:
+            print(f"An error occurred while saving the snapshot: {e}")
+
+    def process_event(self, line: bytes):
+        """
+        Parses, scores and aggregates a single raw event.
+        """
+        received_at = time.perf_counter()
+        try:
+            event = json.loads(line)
+        except ValueError:
+            print(f"Warning: Skipping malformed event: {line[:80]!r}")
+            return
+
+        if not isinstance(event, dict):
+            print(f"Warning: Skipping event that is not a JSON object: {line[:80]!r}")
+            return
+
+        source = str(event.get('source', '')).lower()
+        if source not in ('reddit', 'twitter'):
+            print(f"Warning: Skipping event with unknown source '{source}'.")
+            return
+
+        # A single bad event is logged and skipped so it can't stop the stream
+        try:
+            if source == 'reddit':
+                score = score_reddit_event(event, self._sid)
+            else:
+                score = score_twitter_event(event, self._sid)
+            if not math.isfinite(score):
+                # e.g. two huge counts that overflow; one event must not poison the totals
+                print(f"Warning: Skipping event with a non-finite score: {line[:80]!r}")
+                return
+            coin = str(event.get('coin', 'unknown')).lower()
+            self.aggregator.add(coin, event_timestamp(event), source, score)
+        except Exception as e:
+            print(f"Warning: Skipping event that could not be processed ({e}): {line[:80]!r}")
+            return
+        self.events_processed += 1
+        self.last_latency = time.perf_counter() - received_at
+
+    def run(self):
+        """
+        Runs the stream in the current thread until stop() is called. If the stream
+        stops on an error, the error is printed and kept in `self.error`.
+        """
+        self.error = None
+        setup_vader()
+        try:
+            self._sid = SentimentIntensityAnalyzer()
+        except LookupError as e:
+            print("\n--- NLTK VADER Lexicon Error ---")
+            print("The VADER lexicon could not be found or downloaded.")
+            self.error = e
+            return
+
+        self.load_snapshot()
+        last_snapshot = time.monotonic()
+        try:
+            for line in self.source.events(self._stop_event):
+                self.process_event(line)
+                if time.monotonic() - last_snapshot >= self.snapshot_interval:
+                    self.save_snapshot()
+                    last_snapshot = time.monotonic()
+        except Exception as e:
+            print(f"\n--- Streaming stopped on an error: {e} ---")
+            self.error = e
+        finally:
+            self.save_snapshot()
+
+    def is_running(self) -> bool:
+        """
+        Returns True while the background worker started by start() is alive.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> threading.Thread:
+        """
+        Runs the stream in a background thread so callers can query it while it runs.
+        """
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """
+        Stops the stream and writes a final snapshot.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+# --- Main execution block ---
+if __name__ == "__main__":
+    # Append JSON events to this file (one per line) to feed the stream.
+    events_file_path = "stream_data/events.jsonl"
+
+    stream = SentimentStream(FileTailSource(events_file_path))
+    stream.start()
+    print(f"\n--- Streaming sentiment from '{events_file_path}' (Ctrl+C to stop) ---")
+    try:
+        while True:
+            time.sleep(10)
+            if not stream.is_running():
+                print(f"\nIngestion stopped: {stream.error}. The aggregates below are no longer updating.")
+                print(stream.aggregator.to_frame().tail(10))
+                break
+            print(stream.aggregator.to_frame().tail(10))
+    except KeyboardInterrupt:
+        stream.stop()
+        print(f"\nStopped after {stream.events_processed} events. Snapshot saved to '{stream.snapshot_file}'.")
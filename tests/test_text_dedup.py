@@ -0,0 +1,26 @@
+import os
+import sys
+
+# Make the shared modules in the project root importable when run from anywhere.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_dedup import NearDuplicateIndex, normalize_text
+
+
+def test_many_empty_texts_before_a_real_one():
+    # Link- and emoji-only posts normalize to "" but still take cluster ids.
+    index = NearDuplicateIndex()
+    empty_ids = [index.add("https://t.me/pump 🚀🚀") for _ in range(40)]
+    assert empty_ids == list(range(40))
+
+    first = index.add("PEPE to the moon, buy before it is too late")
+    assert first == 40
+    assert index.add("pepe to the moon!! buy before it is too late https://x.co/a") == first
+
+
+def test_non_latin_text_is_kept_and_clustered():
+    assert normalize_text("比特币 要涨了!!") == "比特币 要涨了"
+
+    index = NearDuplicateIndex()
+    first = index.add("Биткоин скоро вырастет, покупайте сейчас")
+    assert index.add("биткоин скоро вырастет, покупайте сейчас!!! 🚀") == first
+    assert index.add("Совсем другой пост про погоду и котиков") != first
@@ -0,0 +1,271 @@
+import os
+import re
+import tempfile
+import zlib
+from array import array
+import numpy as np
+import pandas as pd
+
+# --- MinHash configuration ---
+# A prime just above 2**32 so every 32-bit shingle hash maps into the permutation space.
+_MINHASH_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+_URL_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+# \w is Unicode-aware, so letters and digits from any script survive normalization.
+_NON_WORD_PATTERN = re.compile(r"[^\w$# ]+")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercases a post and strips links, punctuation and extra whitespace so that
+    copy-paste shill posts with a different link or emoji still look identical.
+
+    Args:
+        text (str): The raw post or tweet text.
+
+    Returns:
+        str: The normalized text (empty string for missing values).
+    """
+    if not isinstance(text, str):
+        return ""
+    text = _URL_PATTERN.sub(" ", text.lower())
+    text = _NON_WORD_PATTERN.sub(" ", text)
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index that assigns every incoming text to a cluster.
+
+    Texts are added one at a time. The first text of a cluster starts it, and every
+    later near-duplicate returns the same cluster id. Band keys are packed into a
+    single 64-bit integer and signatures live in one growing uint32 array, which
+    comes to roughly 1.5 KB per cluster with the default settings (measured with
+    tracemalloc). Use one index per partition (e.g. per day) to bound memory.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8,
+                 shingle_size: int = 5, seed: int = 42):
+        """
+        Args:
+            num_perm (int): Number of MinHash permutations per signature.
+            bands (int): Number of LSH bands. Must divide num_perm evenly.
+            threshold (float): Minimum estimated Jaccard similarity for two texts
+                to be treated as duplicates.
+            shingle_size (int): Length of the character shingles that are hashed.
+            seed (int): Seed for the random permutations, so runs are reproducible.
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands.")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 2**32, size=num_perm, dtype=np.uint64)
+        # Odd multipliers that pack each band's values (and the band number) into one integer.
+        self._band_mixers = rng.randint(1, 2**62, size=self.rows_per_band, dtype=np.uint64) | np.uint64(1)
+        self._band_offsets = rng.randint(0, 2**62, size=bands, dtype=np.uint64)
+
+        # packed band key -> cluster id
+        self._buckets = {}
+        # cluster id -> signature, used to verify LSH candidates
+        self._signatures = np.empty((16, num_perm), dtype=np.uint32)
+        self.size = 0
+
+    def signature(self, text: str):
+        """
+        Computes the MinHash signature of a normalized text.
+
+        Returns:
+            np.ndarray or None: A uint32 array of length num_perm, or None for an
+            empty text.
+        """
+        if not text:
+            return None
+        k = self.shingle_size
+        if len(text) <= k:
+            shingles = {text}
+        else:
+            shingles = {text[i:i + k] for i in range(len(text) - k + 1)}
+
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        # (a * x + b) mod p for every permutation/shingle pair; a, b, x < 2**32 so this cannot overflow.
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MINHASH_PRIME
+        return (permuted.min(axis=1) & _MAX_HASH).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> list:
+        bands = sig.reshape(self.bands, self.rows_per_band).astype(np.uint64)
+        # uint64 arithmetic wraps around, which is exactly what a hash wants.
+        with np.errstate(over='ignore'):
+            return ((bands * self._band_mixers).sum(axis=1) + self._band_offsets).tolist()
+
+    def add(self, text: str) -> int:
+        """
+        Adds a text to the index and returns the id of the cluster it belongs to.
+
+        Args:
+            text (str): The raw text of the row.
+
+        Returns:
+            int: The cluster id. An id equal to the previous size means a new cluster.
+        """
+        sig = self.signature(normalize_text(text))
+
+        band_keys = []
+        if sig is not None:
+            band_keys = self._band_keys(sig)
+            # Check every candidate sharing a band before accepting a match.
+            for key in band_keys:
+                cluster_id = self._buckets.get(key)
+                if cluster_id is None:
+                    continue
+                if np.mean(self._signatures[cluster_id] == sig) >= self.threshold:
+                    return cluster_id
+
+        cluster_id = self.size
+        self.size += 1
+        # Empty texts are never indexed, so each one stays its own cluster.
+        if sig is not None:
+            # Empty texts take ids too, so the array may be several doublings short.
+            if cluster_id >= len(self._signatures):
+                new_size = max(2 * len(self._signatures), cluster_id + 1)
+                self._signatures = np.resize(self._signatures, (new_size, self.num_perm))
+            self._signatures[cluster_id] = sig
+            for key in band_keys:
+                self._buckets.setdefault(key, cluster_id)
+        return cluster_id
+
+
+def find_near_duplicates_csv(file_path: str, text_columns: list, partition_column: str = None,
+                             weight_function=None, weight_columns: list = None,
+                             count_column: str = "duplicate_count", chunksize: int = 20000,
+                             rows_per_bucket: int = 10000, **index_kwargs) -> tuple:
+    """
+    Streams a CSV and finds its near-duplicate rows, without loading the whole file.
+
+    Rows are only clustered with rows that share the same partition (e.g. 'Date'),
+    which keeps daily aggregates attributed to the right day. The rows are first
+    spilled to temporary bucket files holding whole partitions, about
+    `rows_per_bucket` rows each. Buckets are then deduplicated one at a time with a
+    fresh index per partition. Memory stays bounded by one bucket however the file
+    is ordered. Without a partition column all rows form a single bucket.
+
+    Args:
+        file_path (str): Path to the scraped Reddit or Twitter CSV.
+        text_columns (list): The columns whose combined text is compared.
+        partition_column (str): Optional column that rows must share to be merged.
+        weight_function: Optional function taking a chunk and returning each row's
+            weight (e.g. the post's score multiplier). Weights are summed per cluster.
+        weight_columns (list): Extra columns the weight function needs.
+        count_column (str): If the CSV already has this column (it was collapsed
+            before), its values are summed instead of counting each row as 1.
+        chunksize (int): Number of rows read at a time.
+        rows_per_bucket (int): Target number of rows deduplicated at once.
+        **index_kwargs: Settings passed on to NearDuplicateIndex.
+
+    Returns:
+        tuple: (keep, counts, weights). 'keep' is a boolean array over every row of
+        the file marking the first row of each cluster. 'counts' and 'weights' hold
+        one value per kept row, in file order: how many rows it stands for and the
+        sum of their weights.
+    """
+    header = pd.read_csv(file_path, nrows=0).columns
+    present = [col for col in text_columns if col in header]
+    if partition_column not in header:
+        partition_column = None
+
+    # --- Pass 1: count the rows in each partition and pack partitions into buckets ---
+    partition_sizes = {}
+    if partition_column:
+        for chunk in pd.read_csv(file_path, usecols=[partition_column], dtype=object, chunksize=chunksize):
+            for partition, size in chunk[partition_column].fillna('').value_counts(sort=False).items():
+                partition_sizes[partition] = partition_sizes.get(partition, 0) + size
+
+    bucket_of = {}
+    bucket, bucket_rows = 0, 0
+    for partition, size in partition_sizes.items():
+        if bucket_rows and bucket_rows + size > rows_per_bucket:
+            bucket, bucket_rows = bucket + 1, 0
+        bucket_of[partition] = bucket
+        bucket_rows += size
+
+    # --- Pass 2: spill each row's combined text, count and weight to its bucket file ---
+    usecols = present + [col for col in [partition_column, count_column] + (weight_columns or [])
+                         if col and col in header and col not in present]
+    # Plain Python strings: every value is turned into one anyway, and Arrow-backed
+    # strings would leave memory cached in Arrow's allocator.
+    dtypes = {col: object for col in present + ([partition_column] if partition_column else [])}
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        total_rows = 0
+        bucket_files = set()
+        for chunk in pd.read_csv(file_path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+            if partition_column:
+                partitions = chunk[partition_column].fillna('')
+            else:
+                partitions = pd.Series('', index=chunk.index)
+            if count_column in chunk.columns:
+                row_counts = pd.to_numeric(chunk[count_column], errors='coerce').fillna(1).astype('int64')
+            else:
+                row_counts = 1
+            if weight_function is not None:
+                row_weights = np.asarray(weight_function(chunk), dtype='float64')
+            else:
+                row_weights = 1.0
+
+            texts = zip(*(chunk[col].tolist() for col in present)) if present else ([] for _ in range(len(chunk)))
+            spill = pd.DataFrame({
+                'row': np.arange(total_rows, total_rows + len(chunk)),
+                'partition': partitions.to_numpy(dtype=object),
+                'count': row_counts,
+                'weight': row_weights,
+                'text': pd.Series([" ".join(value for value in values if isinstance(value, str)) for values in texts],
+                                  index=chunk.index, dtype=object),
+            })
+            total_rows += len(chunk)
+
+            buckets = spill['partition'].map(bucket_of) if partition_column else pd.Series(0, index=spill.index)
+            for bucket, rows in spill.groupby(buckets, sort=False):
+                bucket_file = os.path.join(spill_dir, f"bucket_{bucket}.csv")
+                rows.to_csv(bucket_file, mode='a', header=bucket_file not in bucket_files, index=False)
+                bucket_files.add(bucket_file)
+
+        # --- Pass 3: deduplicate one bucket at a time ---
+        keep = np.zeros(total_rows, dtype=bool)
+        counts_by_row = np.zeros(total_rows, dtype='int64')
+        weights_by_row = np.zeros(total_rows, dtype='float64')
+        for bucket_file in bucket_files:
+            indexes = {}  # partition -> (index, row of each cluster's first post)
+            for rows in pd.read_csv(bucket_file, dtype={'partition': object, 'text': object},
+                                    keep_default_na=False, chunksize=chunksize):
+                for row, partition, count, weight, text in zip(
+                    rows['row'].tolist(), rows['partition'].tolist(), rows['count'].tolist(),
+                    rows['weight'].tolist(), rows['text'].tolist(),
+                ):
+                    if partition not in indexes:
+                        indexes[partition] = (NearDuplicateIndex(**index_kwargs), array('q'))
+                    index, first_rows = indexes[partition]
+
+                    cluster_id = index.add(text)
+                    if cluster_id == len(first_rows):
+                        keep[row] = True
+                        first_rows.append(row)
+                        counts_by_row[row] = count
+                        weights_by_row[row] = weight
+                    else:
+                        first_row = first_rows[cluster_id]
+                        counts_by_row[first_row] += count
+                        weights_by_row[first_row] += weight
+            del indexes
+            os.remove(bucket_file)
+
+    return keep, counts_by_row[keep], weights_by_row[keep]
@@ -1,9 +1,18 @@
 import pandas as pd
 import os
+import sys
 import nltk
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 import numpy as np
 
+# Make the shared modules in the project root importable when run as a script.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_dedup import find_near_duplicates_csv
+from frame_schema import (
+    TWITTER_CATEGORY_COLUMNS, TWITTER_TEXT_COLUMNS,
+    iter_csv_chunks,
+)
+
 def setup_vader():
     """
     Attempts to download the VADER lexicon if it's not already present.
@@ -23,21 +32,97 @@ def analyze_sentiment_score(text: str, sid: SentimentIntensityAnalyzer) -> float
     scores = sid.polarity_scores(text)
     return scores['compound']
 
-def process_advanced_tweet_analysis(file_path: str):
+def tweet_weights(df: pd.DataFrame) -> pd.Series:
+    """
+    Returns the weight of each tweet: favorites * log(1 + followers), where a missing
+    column counts as 1. Rows that were already collapsed keep their summed 'cluster_weight'.
+    """
+    if 'cluster_weight' in df.columns:
+        return pd.to_numeric(df['cluster_weight'], errors='coerce').fillna(0)
+    weights = pd.Series(1.0, index=df.index)
+    if 'tweet_favorite_count' in df.columns:
+        weights = weights * pd.to_numeric(df['tweet_favorite_count'], errors='coerce').fillna(0)
+    if 'user_followers_count' in df.columns:
+        weights = weights * np.log1p(pd.to_numeric(df['user_followers_count'], errors='coerce').fillna(0))
+    return weights
+
+def score_tweet_chunk(df: pd.DataFrame, sid: SentimentIntensityAnalyzer, drop_text: bool = False) -> pd.DataFrame:
+    """
+    Scores one chunk of tweets and adds the weighted favorite, follower influence
+    and final weighted scores.
+
+    Args:
+        df (pd.DataFrame): A chunk of the Twitter CSV.
+        sid (SentimentIntensityAnalyzer): An instance of the VADER sentiment analyzer.
+        drop_text (bool): If True, 'tweet_text' is dropped as soon as it is scored.
+
+    Returns:
+        pd.DataFrame: The scored chunk.
+    """
+    # --- Initial Sentiment Analysis ---
+    if 'tweet_text' in df.columns:
+        df['sentiment_score'] = df['tweet_text'].fillna('').apply(lambda text: analyze_sentiment_score(text, sid)).astype('float64')
+        if drop_text:
+            df = df.drop(columns=['tweet_text'])
+    sentiment_score = df['sentiment_score'].astype('float64')
+
+    # --- Calculate Weighted Favorite Score ---
+    if 'tweet_favorite_count' not in df.columns:
+        df['weighted_favorite_score'] = sentiment_score # Default to base sentiment if no favs
+    else:
+        # Ensure the column is numeric, filling non-numeric values with 0
+        df['tweet_favorite_count'] = pd.to_numeric(df['tweet_favorite_count'], errors='coerce').fillna(0).astype('int32')
+        df['weighted_favorite_score'] = sentiment_score * df['tweet_favorite_count']
+
+    # --- Calculate Follower Influence Score (Logarithmic Weighting) ---
+    if 'user_followers_count' not in df.columns:
+        df['follower_influence_score'] = 1 # Default to 1 if no follower count
+    else:
+        # Ensure the column is numeric
+        df['user_followers_count'] = pd.to_numeric(df['user_followers_count'], errors='coerce').fillna(0).astype('int32')
+
+        # Use np.log1p which calculates log(1 + x) to gracefully handle users with 0 followers.
+        # This gives a better representation of influence than raw counts.
+        df['follower_influence_score'] = np.log1p(df['user_followers_count'].astype('float64'))
+
+    # --- Calculate Final Combined Score ---
+    df['final_weighted_score'] = df['weighted_favorite_score'] * df['follower_influence_score']
+
+    # A collapsed row stands for all tweets in its cluster, each with its own favorites and followers.
+    if 'cluster_weight' in df.columns:
+        df['final_weighted_score'] = sentiment_score * df['cluster_weight']
+
+    return df
+
+def process_advanced_tweet_analysis(file_path: str, collapse_duplicates: bool = False, drop_text: bool = False,
+                                    output_path: str = None, chunksize: int = 2000):
     """
     Reads a CSV, performs sentiment analysis, and adds weighted scores
     based on favorites and follower influence.
 
+    The CSV is processed in chunks of `chunksize` rows, so only one chunk of text
+    is in memory at a time, and the results are written out chunk by chunk.
+
     Args:
         file_path (str): The full path to the CSV file.
+        collapse_duplicates (bool): If True, near-duplicate tweets on the same day
+            (copy-paste shills, bot spam) are collapsed into one row before scoring.
+            The row gets a 'duplicate_count' column and a 'cluster_weight' column
+            holding the summed favorites * log(1 + followers) of its tweets, and its
+            final score is the tweet's sentiment times that summed weight.
+        drop_text (bool): If True, 'tweet_text' is dropped once 'sentiment_score' is
+            computed. Later runs reuse the existing 'sentiment_score' column.
+        output_path (str): Where to save the results. Defaults to file_path, or to
+            '<name>_deduped.csv' when collapsing, so the raw scrape is never overwritten.
+        chunksize (int): Number of rows processed at a time.
     """
     # --- Step 1: Setup and Validation ---
     if not os.path.exists(file_path):
         print(f"Error: The file '{file_path}' was not found.")
         return
-        
+
     setup_vader()
-    
+
     try:
         sid = SentimentIntensityAnalyzer()
     except LookupError:
@@ -45,56 +130,65 @@ def process_advanced_tweet_analysis(file_path: str):
         print("The VADER lexicon could not be found or downloaded.")
         return
 
+    if output_path is None:
+        output_path = f"{os.path.splitext(file_path)[0]}_deduped.csv" if collapse_duplicates else file_path
+
     try:
-        df = pd.read_csv(file_path)
-        print(f"Successfully loaded '{file_path}'. Original shape: {df.shape[0]} rows, {df.shape[1]} columns.")
+        header = pd.read_csv(file_path, nrows=0).columns
     except Exception as e:
         print(f"An error occurred while reading the CSV file: {e}")
         return
 
-    # --- Step 2: Initial Sentiment Analysis ---
-    if 'tweet_text' not in df.columns:
-        print("Error: Column 'tweet_text' not found. Aborting.")
-        return
-        
-    print("Analyzing sentiment for 'tweet_text'...")
-    df['sentiment_score'] = df['tweet_text'].fillna('').apply(lambda text: analyze_sentiment_score(text, sid))
-
-    # --- Step 3: Calculate Weighted Favorite Score ---
-    if 'tweet_favorite_count' not in df.columns:
+    if 'tweet_text' not in header:
+        if 'sentiment_score' not in header:
+            print("Error: Column 'tweet_text' not found. Aborting.")
+            return
+        # The raw text was dropped on an earlier run, so keep the existing scores.
+        print("Column 'tweet_text' was dropped earlier. Reusing existing 'sentiment_score'.")
+        if collapse_duplicates:
+            print("Warning: Cannot find near-duplicates without 'tweet_text'. Skipping collapse.")
+            collapse_duplicates = False
+    if 'tweet_favorite_count' not in header:
         print("Warning: 'tweet_favorite_count' column not found. Skipping weighted favorite score.")
-        df['weighted_favorite_score'] = df['sentiment_score'] # Default to base sentiment if no favs
-    else:
-        print("Calculating weighted favorite score...")
-        # Ensure the column is numeric, filling non-numeric values with 0
-        df['tweet_favorite_count'] = pd.to_numeric(df['tweet_favorite_count'], errors='coerce').fillna(0)
-        df['weighted_favorite_score'] = df['sentiment_score'] * df['tweet_favorite_count']
-
-    # --- Step 4: Calculate Follower Influence Score (Logarithmic Weighting) ---
-    # Using the corrected column name 'user_followers_count'
-    if 'user_followers_count' not in df.columns:
+    if 'user_followers_count' not in header:
         print("Warning: 'user_followers_count' column not found. Skipping follower analysis.")
-        df['follower_influence_score'] = 1 # Default to 1 if no follower count
-    else:
-        print("Analyzing user influence using logarithmic weighting...")
-        # Ensure the column is numeric
-        df['user_followers_count'] = pd.to_numeric(df['user_followers_count'], errors='coerce').fillna(0)
 
-        # Use np.log1p which calculates log(1 + x) to gracefully handle users with 0 followers.
-        # This gives a better representation of influence than raw counts.
-        df['follower_influence_score'] = np.log1p(df['user_followers_count'])
+    # --- Step 2: Find near-duplicate tweets so each cluster is scored once ---
+    if collapse_duplicates:
+        print("Finding near-duplicate tweets...")
+        keep, counts, weights = find_near_duplicates_csv(
+            file_path, TWITTER_TEXT_COLUMNS, partition_column='Date', weight_function=tweet_weights,
+            weight_columns=['tweet_favorite_count', 'user_followers_count', 'cluster_weight'],
+            chunksize=chunksize,
+        )
+        print(f"Collapsing {len(keep)} tweets into {len(counts)} unique tweets.")
 
-    # --- Step 5: Calculate Final Combined Score ---
-    print("Calculating final weighted score...")
-    df['final_weighted_score'] = df['weighted_favorite_score'] * df['follower_influence_score']
+    # --- Step 3: Score the tweets chunk by chunk and write them out ---
+    print(f"Analyzing sentiment for '{file_path}' in chunks of {chunksize} rows...")
+    temp_path = f"{output_path}.tmp"
+    rows_read, rows_written = 0, 0
+    try:
+        for i, chunk in enumerate(iter_csv_chunks(file_path, TWITTER_CATEGORY_COLUMNS, TWITTER_TEXT_COLUMNS, chunksize)):
+            if collapse_duplicates:
+                chunk_keep = keep[rows_read:rows_read + len(chunk)]
+                rows_read += len(chunk)
+                chunk = chunk[chunk_keep].reset_index(drop=True)
+                chunk['duplicate_count'] = counts[rows_written:rows_written + len(chunk)]
+                chunk['cluster_weight'] = weights[rows_written:rows_written + len(chunk)]
 
+            chunk = score_tweet_chunk(chunk, sid, drop_text)
+            chunk.to_csv(temp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            rows_written += len(chunk)
 
-    # --- Step 6: Save the enhanced DataFrame back to the CSV ---
-    try:
-        df.to_csv(file_path, index=False)
-        print(f"\nAnalysis complete. The updated data has been saved back to '{file_path}'.")
+        if not os.path.exists(temp_path):
+            print("The CSV file is empty. No action taken.")
+            return
+        os.replace(temp_path, output_path)
+        print(f"\nAnalysis complete. {rows_written} scored tweets have been saved to '{output_path}'.")
     except Exception as e:
-        print(f"An error occurred while saving the updated file: {e}")
+        print(f"An error occurred while processing the file: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 # --- Main execution block ---
 if __name__ == "__main__":
@@ -102,7 +196,9 @@ if __name__ == "__main__":
     csv_file_path = f"twitter_data/bitcoin_twitter_data.csv"
 
     print("\n--- Starting Advanced Tweet Analysis Process ---")
-    process_advanced_tweet_analysis(csv_file_path)
+    # Collapse bot tweets first; the scored tweets are saved to
+    # 'twitter_data/bitcoin_twitter_data_deduped.csv', which data_merger reads.
+    process_advanced_tweet_analysis(csv_file_path, collapse_duplicates=True)
     
     # You can uncomment the line below to see the final DataFrame in the console.
     # print("\n--- Content of the file after analysis ---")